@@ -0,0 +1,103 @@
+"""
+Request batcher module
+
+- Coalesces LLM decision requests that arrive within a short window (e.g. several
+  concurrent battles reaching a decision point together) into a single API call.
+- A batch of one is sent through the normal single-request path from the
+  caller's own task, so a lone battle behaves exactly as without batching
+  (plus the wait window) and its timeout/cancel reaches the request directly.
+- Requests whose caller already gave up (timeout/cancel) are dropped before
+  the call is made; a batched call is cancelled once every caller gave up.
+- Only requests submitted with the same key (e.g. the model name) are merged.
+"""
+
+# ruff: noqa
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+# 묶을 상대가 없었던 요청: 결과 대신 이 값을 받고 호출한 쪽 task에서 직접 단건 요청
+_RUN_SINGLE = object()
+
+
+class RequestBatcher:
+    """
+    - submit(item, key): 대기열에 넣고 결과를 await (key가 같은 요청끼리만 묶음)
+    - window 초 동안 모인 요청 (또는 max_batch개가 차면 즉시) 을 한 번에 처리
+    - single_fn(item) / batch_fn(items) 는 poke-env 이벤트 루프 안에서 호출됨
+    - window가 0이면 묶지 않고 바로 single_fn
+    """
+
+    def __init__(
+        self,
+        single_fn: Callable[[Any], Awaitable[Any]],
+        batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        window: float = 0.01,
+        max_batch: int = 8,
+    ):
+        self._single = single_fn
+        self._batch = batch_fn
+        self.window = max(0.0, float(window))
+        self.max_batch = max(1, int(max_batch))
+        self._pending: Dict[Any, List[Tuple[asyncio.Future, Any]]] = {}  # key → 대기 요청
+        self._timers: Dict[Any, asyncio.Task] = {}
+        self._running: Set[asyncio.Task] = set()  # 진행 중인 배치 호출 (참조 유지 + 취소용)
+
+    async def submit(self, item: Any, key: Any = None) -> Any:
+        if self.window <= 0:
+            return await self._single(item)
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((fut, item))
+        if len(pending) >= self.max_batch:
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            self._dispatch(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.create_task(self._flush_later(key))
+        res = await fut
+        if res is _RUN_SINGLE:
+            return await self._single(item)
+        return res
+
+    async def _flush_later(self, key: Any):
+        await asyncio.sleep(self.window)
+        self._timers.pop(key, None)
+        self._dispatch(key)
+
+    def _dispatch(self, key: Any):
+        batch = self._pending.pop(key, [])
+        live = [(f, it) for f, it in batch if not f.done()]  # 이미 타임아웃된 요청은 제외
+        if not live:
+            return
+        if len(live) == 1:
+            live[0][0].set_result(_RUN_SINGLE)
+            return
+        task = asyncio.get_running_loop().create_task(self._run(live))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+        def _maybe_cancel(_f: asyncio.Future):
+            # 묶인 요청을 기다리는 쪽이 모두 포기했으면 네트워크 요청도 중단
+            if not task.done() and all(f.done() for f, _ in live):
+                task.cancel()
+
+        for f, _ in live:
+            f.add_done_callback(_maybe_cancel)
+
+    async def _run(self, live: List[Tuple[asyncio.Future, Any]]):
+        try:
+            results = await self._batch([it for _, it in live])
+            if len(results) != len(live):
+                raise ValueError(f"batch_size_mismatch:{len(results)}!={len(live)}")
+        except Exception as e:
+            for f, _ in live:
+                if not f.done():
+                    f.set_exception(e)
+            return
+        for (f, _), r in zip(live, results):
+            if not f.done():
+                f.set_result(r)
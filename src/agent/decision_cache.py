@@ -0,0 +1,212 @@
+"""
+Decision cache module
+
+- Caches validated LLM decisions so that battle situations seen before (in this
+  battle, another battle, or a previous run) skip the API round-trip.
+- Exact-match tier: keyed by a canonical hash of (state, candidates).
+- Semantic tier: coarse buckets over the active matchup, reused when the move
+  set and HP values are close enough (near-identical turns).
+- In-process LRU (OrderedDict) with optional shelve persistence on disk.
+"""
+
+# ruff: noqa
+from __future__ import annotations
+
+import hashlib
+import json
+import shelve
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 캐시 키에서 제외할 state 필드 (결정에 영향 없는 값)
+_VOLATILE_STATE_KEYS = ("turn",)
+
+
+def decision_key(state: dict, rows: List[dict], salt: bytes = b"") -> bytes:
+    """
+    (state, candidates) → 16바이트 blake2b. 턴 번호처럼 매번 바뀌는 필드는 제외.
+    salt: 모델/시스템 프롬프트/샘플링 설정 지문 → 프롬프트가 바뀌면 디스크 캐시도 자연히 무효화
+    """
+    s = {k: v for k, v in state.items() if k not in _VOLATILE_STATE_KEYS}
+    payload = json.dumps({"s": s, "r": rows}, sort_keys=True, ensure_ascii=False)
+    h = hashlib.blake2b(salt, digest_size=16)
+    h.update(payload.encode("utf-8"))
+    return h.digest()
+
+
+class DecisionCache:
+    """
+    - 메모리 LRU (기본 4096개) + 선택적 shelve 영속화
+    - shelve 키는 str만 되므로 key.hex() 사용
+    - 디스크 오류는 조용히 무시 (캐시는 있으면 좋은 것)
+    """
+
+    def __init__(self, maxsize: int = 4096, path: Optional[str] = None):
+        self.maxsize = max(1, int(maxsize))
+        self._lru: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._db = None
+        if path:
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = shelve.open(str(path))
+            except Exception:
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        dec = self._lru.get(key)
+        if dec is not None:
+            self._lru.move_to_end(key)
+            return dict(dec)
+        if self._db is None:
+            return None
+        try:
+            dec = self._db.get(key.hex())
+        except Exception:
+            dec = None
+        if dec is None:
+            return None
+        self._remember(key, dec)
+        return dict(dec)
+
+    def put(self, key: bytes, dec: Dict[str, Any]) -> None:
+        dec = dict(dec)
+        self._remember(key, dec)
+        if self._db is not None:
+            try:
+                self._db[key.hex()] = dec
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+            self._db = None
+
+    def _remember(self, key: bytes, dec: Dict[str, Any]) -> None:
+        self._lru[key] = dec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+
+# =========================
+# Semantic (near-match) tier
+# =========================
+
+def _hp(mon: dict) -> int:
+    hp = mon.get("hp_pct")
+    return 100 if hp is None else int(hp)
+
+
+def _bucket_key(state: dict, salt: bytes = b"") -> bytes:
+    """매치업 특징 (종족/타입/HP 10% 구간/강제교대) → 64bit 버킷 키."""
+    me = state.get("my_active") or {}
+    opp = state.get("opp_active") or {}
+    feat = (
+        me.get("species"),
+        opp.get("species"),
+        tuple(sorted(me.get("types") or [])),
+        tuple(sorted(opp.get("types") or [])),
+        round(_hp(me) / 10),
+        round(_hp(opp) / 10),
+        bool(state.get("force_switch")),
+    )
+    h = hashlib.blake2b(salt, digest_size=8)
+    h.update(repr(feat).encode("utf-8"))
+    return h.digest()
+
+
+def _move_ids(rows: List[dict]) -> List[str]:
+    return sorted(r["id"] for r in rows if r.get("kind") == "move")
+
+
+def _jaccard(a: List[str], b: List[str]) -> float:
+    sa, sb = set(a), set(b)
+    if not sa and not sb:
+        return 1.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def _target_of(dec: dict, rows: List[dict]) -> Optional[str]:
+    """결정 index → 기술 id / 교체 대상 species (후보 순서가 달라도 다시 찾을 수 있게)."""
+    kind = "switch" if dec.get("action") == "switch" else "move"
+    same = [r for r in rows if r.get("kind") == kind]
+    idx = dec.get("index")
+    if not isinstance(idx, int) or not 0 <= idx < len(same):
+        return None
+    return same[idx].get("id") if kind == "move" else same[idx].get("species")
+
+
+def _resolve(dec: dict, target: str, rows: List[dict]) -> Optional[dict]:
+    kind = "switch" if dec.get("action") == "switch" else "move"
+    field = "id" if kind == "move" else "species"
+    same = [r for r in rows if r.get("kind") == kind]
+    for i, r in enumerate(same):
+        if r.get(field) == target:
+            return {**dec, "index": i}
+    return None
+
+
+class SemanticCache:
+    """
+    - 1단계: 매치업 버킷 (_bucket_key)
+    - 2단계: 버킷 안에서 Jaccard(기술 id) >= min_jaccard 이고 양쪽 HP 차이 < max_hp_delta 인 항목
+    - 결정은 index가 아니라 기술 id / species로 저장해서 현재 후보 index로 다시 매핑
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        path: Optional[str] = None,
+        min_jaccard: float = 0.9,
+        max_hp_delta: int = 15,
+        per_bucket: int = 8,
+    ):
+        self.min_jaccard = float(min_jaccard)
+        self.max_hp_delta = int(max_hp_delta)
+        self.per_bucket = max(1, int(per_bucket))
+        self._buckets = DecisionCache(maxsize=maxsize, path=path)
+
+    def get(self, state: dict, rows: List[dict], salt: bytes = b"") -> Optional[Tuple[Dict[str, Any], float]]:
+        bucket = self._buckets.get(_bucket_key(state, salt))
+        if not bucket:
+            return None
+        me_hp = _hp(state.get("my_active") or {})
+        opp_hp = _hp(state.get("opp_active") or {})
+        moves = _move_ids(rows)
+        for e in reversed(bucket["entries"]):  # 최근 항목 우선
+            sim = _jaccard(moves, e["moves"])
+            if sim < self.min_jaccard:
+                continue
+            if abs(me_hp - e["my_hp"]) >= self.max_hp_delta or abs(opp_hp - e["opp_hp"]) >= self.max_hp_delta:
+                continue
+            dec = _resolve(e["dec"], e["target"], rows)
+            if dec is not None:
+                return dec, sim
+        return None
+
+    def put(self, state: dict, rows: List[dict], dec: Dict[str, Any], salt: bytes = b"") -> None:
+        target = _target_of(dec, rows)
+        if target is None:
+            return
+        key = _bucket_key(state, salt)
+        bucket = self._buckets.get(key) or {"entries": []}
+        bucket["entries"].append({
+            "my_hp": _hp(state.get("my_active") or {}),
+            "opp_hp": _hp(state.get("opp_active") or {}),
+            "moves": _move_ids(rows),
+            "target": target,
+            "dec": dict(dec),
+        })
+        bucket["entries"] = bucket["entries"][-self.per_bucket:]
+        self._buckets.put(key, bucket)
+
+    def close(self) -> None:
+        self._buckets.close()
@@ -14,17 +14,28 @@ LLMPlayer module
 # ruff: noqa
 from __future__ import annotations
 
+import asyncio
+import atexit
+import hashlib
 import json
 import os
+import queue
 import random
-from dataclasses import asdict, dataclass
+import re
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from dotenv import load_dotenv
 
 # poke-env 0.10: Player는 여기
 from poke_env.player.player import Player
+from poke_env.player.battle_order import SingleBattleOrder
+
+from agent.batcher import RequestBatcher
+from agent.decision_cache import DecisionCache, SemanticCache, decision_key
+from agent.type_chart import effectiveness, effectiveness_many, warmup as _warmup_type_chart
 
 # 타입 힌트를 위해 (런타임 의존 없음)
 try:
@@ -36,11 +47,62 @@ except Exception:  # pragma: no cover
     Move = Any  # type: ignore
     Pokemon = Any  # type: ignore
 
-# OpenAI 클라이언트 (키 없으면 None)
+# OpenAI 비동기 클라이언트 (키 없으면 None)
+try:
+    from openai import AsyncOpenAI  # >= 1.x
+except Exception:  # pragma: no cover
+    AsyncOpenAI = None  # type: ignore
+
+# openai 의존성으로 같이 설치됨 (커넥션 풀 공유용)
+try:
+    import httpx
+except Exception:  # pragma: no cover
+    httpx = None  # type: ignore
+
+
+# 후보 테이블 출력용 (full 로그 모드에서만 사용, Console은 하나만 재사용)
+try:
+    from rich.console import Console
+    from rich.table import Table
+
+    _CONSOLE = Console()
+except Exception:  # pragma: no cover
+    Table = None  # type: ignore
+    _CONSOLE = None
+
+# 빠른 JSON 직렬화 (poke-env가 이미 쓰는 orjson, 없으면 표준 json)
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+# JSON 헬퍼: orjson(Rust)이 있으면 그걸로, 없으면 표준 json. 둘 다 str을 돌려줌.
+# (indent/sort_keys가 필요한 곳만 json을 직접 사용)
+if orjson is not None:
+    _loads = orjson.loads
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+else:  # pragma: no cover
+    _loads = json.loads
+
+    def _dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+# 폴백 스코어링 가속 (선택 의존성: 없으면 순수 파이썬으로 동작)
+try:
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
 try:
-    from openai import OpenAI  # >= 1.x
+    from numba import njit
 except Exception:  # pragma: no cover
-    OpenAI = None  # type: ignore
+    njit = None  # type: ignore
+
+
+# 낡은 결정용 빈 주문: poke-env가 "battle_tag|" (빈 메시지)를 보내고 서버는 무시
+_NO_ORDER = SingleBattleOrder("")
 
 
 # =========================
@@ -54,12 +116,79 @@ LOG_MODE = os.getenv("LLM_LOG_MODE", "none")  # none | compact | full
 TRACE_FILE = os.getenv("LLM_TRACE_FILE")  # jsonl 경로
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_KEY = os.getenv("OPENAI_API_KEY", "")
+LLM_SEED = int(os.getenv("LLM_SEED", "42"))  # temperature=0 + 고정 seed → 같은 입력이면 같은 결정
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "5.0"))  # 초과 시 기대대미지 폴백
+LLM_TOP_K_MOVES = int(os.getenv("LLM_TOP_K_MOVES", "4"))  # LLM에 보낼 기술 후보 수 (0이면 전부)
+LLM_TOP_K_SWITCHES = int(os.getenv("LLM_TOP_K_SWITCHES", "3"))  # LLM에 보낼 교체 후보 수 (0이면 전부)
+LLM_DOMINANT_SKIP = os.getenv("LLM_DOMINANT_SKIP", "1") == "1"  # 압도적 기술 있으면 LLM 생략 (평가 땐 0)
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "10"))  # 동시 배틀 요청 묶는 대기 시간 (0이면 끔)
+LLM_BATCH_MAX = int(os.getenv("LLM_BATCH_MAX", "8"))  # 한 번에 묶을 최대 요청 수
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "4096"))  # 0이면 결정 캐시 끔
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")  # 설정 시 디스크에도 저장 (예: ~/.cache/poke-llm)
+LLM_SEMANTIC_CACHE = os.getenv("LLM_SEMANTIC_CACHE", "1") == "1"  # 비슷한 턴 결정 재사용
+LLM_JIT_WARMUP = os.getenv("LLM_JIT_WARMUP", "0") == "1"  # numba 커널 미리 컴파일 (기술 16개+ 입력을 쓸 때만 의미 있음)
 
 # 기록 파일 디렉토리 자동 생성
 if TRACE_FILE:
     Path(TRACE_FILE).parent.mkdir(parents=True, exist_ok=True)
 
 
+_HTTP_CLIENT = None
+
+
+def _shared_http_client():
+    """모든 LLMPlayer가 같이 쓰는 httpx.AsyncClient (poke-env 이벤트 루프 하나에서만 사용)."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None and httpx is not None:
+        _HTTP_CLIENT = httpx.AsyncClient(limits=httpx.Limits(max_connections=64))
+    return _HTTP_CLIENT
+
+
+_DECISION_CACHE: Optional[DecisionCache] = None
+
+
+def _decision_cache() -> Optional[DecisionCache]:
+    """프로세스 전체에서 하나만 쓰는 결정 캐시 (shelve는 동시에 두 번 열 수 없음)."""
+    global _DECISION_CACHE
+    if LLM_CACHE_SIZE <= 0:
+        return None
+    if _DECISION_CACHE is None:
+        path = str(Path(LLM_CACHE_DIR).expanduser() / "decisions.db") if LLM_CACHE_DIR else None
+        _DECISION_CACHE = DecisionCache(maxsize=LLM_CACHE_SIZE, path=path)
+        atexit.register(_DECISION_CACHE.close)
+    return _DECISION_CACHE
+
+
+_SEMANTIC_CACHE: Optional[SemanticCache] = None
+
+
+def _semantic_cache() -> Optional[SemanticCache]:
+    """비슷한 매치업(HP 조금 차이 등) 결정 재사용용 근사 캐시."""
+    global _SEMANTIC_CACHE
+    if LLM_CACHE_SIZE <= 0 or not LLM_SEMANTIC_CACHE:
+        return None
+    if _SEMANTIC_CACHE is None:
+        path = str(Path(LLM_CACHE_DIR).expanduser() / "semantic.db") if LLM_CACHE_DIR else None
+        _SEMANTIC_CACHE = SemanticCache(maxsize=LLM_CACHE_SIZE, path=path)
+        atexit.register(_SEMANTIC_CACHE.close)
+    return _SEMANTIC_CACHE
+
+
+_KERNELS_WARM = False
+
+
+def _warm_kernels() -> None:
+    """numba 커널 컴파일을 턴 밖에서 미리 (프로세스당 한 번, LLM_JIT_WARMUP=1일 때 LLMPlayer 생성 시)."""
+    global _KERNELS_WARM
+    if _KERNELS_WARM:
+        return
+    _KERNELS_WARM = True
+    _warmup_type_chart()
+    if np is not None and _score_arrays is not _score_vec:
+        one = np.ones(1, dtype=np.float32)
+        _score_arrays(one, one, np.ones(1, dtype=np.bool_), one)
+
+
 def _print_full(*a):
     if LOG_MODE == "full":
         print(*a)
@@ -70,23 +199,79 @@ def _print_compact(*a):
         print(*a)
 
 
+# 기록은 백그라운드 스레드가 모아서 씀 → choose_move 쪽은 queue.put만 (open/close syscall 없음)
+_TRACE_Q: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=10000)
+_TRACE_FH = None
+_TRACE_THREAD: Optional[threading.Thread] = None
+
+
+def _trace_writer_loop():
+    while True:
+        batch = [_TRACE_Q.get()]
+        try:
+            while len(batch) < 64:
+                batch.append(_TRACE_Q.get_nowait())
+        except queue.Empty:
+            pass
+        stop = None in batch
+        try:
+            _TRACE_FH.write("".join(line for line in batch if line is not None))
+            _TRACE_FH.flush()
+        except Exception:
+            pass
+        if stop:
+            return
+
+
+def _close_trace():
+    """종료 시 큐에 남은 이벤트까지 쓰고 파일 닫기."""
+    if _TRACE_THREAD is None:
+        return
+    try:
+        _TRACE_Q.put(None, timeout=1.0)
+    except queue.Full:
+        pass
+    _TRACE_THREAD.join(timeout=2.0)
+    try:
+        _TRACE_FH.close()
+    except Exception:
+        pass
+
+
+if TRACE_FILE:
+    try:
+        _TRACE_FH = open(TRACE_FILE, "a", buffering=1 << 16, encoding="utf-8")
+        _TRACE_THREAD = threading.Thread(target=_trace_writer_loop, name="llm-trace-writer", daemon=True)
+        _TRACE_THREAD.start()
+        atexit.register(_close_trace)
+    except Exception:
+        _TRACE_FH = None
+        _TRACE_THREAD = None
+
+# 호출부에서 `if _TRACE_ENABLED:`로 먼저 확인 → 기록 꺼져 있으면 payload 인자 구성 자체를 생략
+_TRACE_ENABLED = _TRACE_THREAD is not None
+
+
 def _trace(event: str, **payload):
     """한 줄 JSONL로 디스크에 기록 (ON/OFF: LLM_TRACE_FILE)."""
-    if not TRACE_FILE:
+    if not _TRACE_ENABLED:
         return
     rec = {"event": event, **payload}
     try:
-        with open(TRACE_FILE, "a", encoding="utf-8") as f:
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        line = _dumps(rec)
+        _TRACE_Q.put_nowait(line + "\n")
     except Exception:
-        pass
+        pass  # 큐가 가득 차면 그 이벤트는 버림 (의사결정 경로를 막지 않음)
 
 
 # =========================
 # 데이터 포맷 정의
 # =========================
 
-@dataclass
+# slots=True: 인스턴스 __dict__ 없음 (턴 × 후보 × 배틀 수만큼 만들어지는 객체)
+# asdict()는 재귀 복사라 느림 → to_dict()로 직접 변환
+
+@dataclass(slots=True, frozen=True)
 class RowMove:
     kind: str  # "move"
     index: int
@@ -99,17 +284,44 @@ class RowMove:
     category: str
     pp: int
     is_stab: bool
+    effectiveness: float  # 상대 액티브 타입 기준 상성 배율 (0/0.25/0.5/1/2/4)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "index": self.index,
+            "id": self.id,
+            "name": self.name,
+            "type": self.type,
+            "base_power": self.base_power,
+            "accuracy": self.accuracy,
+            "priority": self.priority,
+            "category": self.category,
+            "pp": self.pp,
+            "is_stab": self.is_stab,
+            "effectiveness": self.effectiveness,
+        }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RowSwitch:
     kind: str  # "switch"
     index: int
     species: str
-    types: List[str]
+    types: Tuple[str, ...]
     hp_pct: int
     status: Optional[str]
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "index": self.index,
+            "species": self.species,
+            "types": list(self.types),
+            "hp_pct": self.hp_pct,
+            "status": self.status,
+        }
+
 
 def _safe_types(obj) -> List[str]:
     """poke-env Type enum -> 대문자 문자열 리스트."""
@@ -155,11 +367,11 @@ def _move_base_power(m: Move) -> int:
         return 0
 
 
-def _is_stab(move: Move, me_active: Optional[Pokemon]) -> bool:
+def _is_stab_precomputed(move: Move, my_types: frozenset) -> bool:
+    """my_types는 choose_move에서 한 번만 계산해 넘겨받음 (기술마다 타입 재계산 X)."""
     try:
-        if not me_active or not move.type:
+        if not my_types or not move.type:
             return False
-        my_types = _safe_types(me_active)
         return move.type.name in my_types
     except Exception:
         return False
@@ -179,36 +391,135 @@ def _priority(m: Move) -> int:
         return 0
 
 
-def _move_row(i: int, m: Move, me_active: Optional[Pokemon]) -> RowMove:
+def _move_type(m: Move) -> str:
+    return m.type.name if getattr(m, "type", None) else "UNKNOWN"
+
+
+def _move_row(i: int, m: Move, my_types: frozenset, eff: float = 1.0) -> RowMove:
     return RowMove(
         kind="move",
         index=i,
         id=getattr(m, "id", getattr(m, "name", f"move{i}")).lower(),
         name=(getattr(m, "name", getattr(m, "id", f"move{i}")) or f"move{i}").lower(),
-        type=(m.type.name if getattr(m, "type", None) else "UNKNOWN"),
+        type=_move_type(m),
         base_power=_move_base_power(m),
         accuracy=_move_accuracy(m),
         priority=_priority(m),
         category=_category(m),
         pp=int(getattr(m, "current_pp", getattr(m, "max_pp", 0)) or 0),
-        is_stab=_is_stab(m, me_active),
+        is_stab=_is_stab_precomputed(m, my_types),
+        effectiveness=eff,
     )
 
 
-def _switch_row(i: int, p: Pokemon) -> RowSwitch:
+def _mon_info(p: Pokemon) -> Tuple[Tuple[str, ...], int, Optional[str]]:
+    """(types, hp_pct, status) 한 번에."""
+    return tuple(_safe_types(p)), _hp_pct(p), _status(p)
+
+
+def _switch_row(i: int, p: Pokemon, info: Optional[Tuple[Tuple[str, ...], int, Optional[str]]] = None) -> RowSwitch:
+    types, hp, status = info if info is not None else _mon_info(p)
     return RowSwitch(
         kind="switch",
         index=i,
         species=(getattr(p, "species", getattr(p, "name", f"p{i}")) or f"p{i}").lower(),
-        types=_safe_types(p),
-        hp_pct=_hp_pct(p),
-        status=_status(p),
+        types=types,
+        hp_pct=hp,
+        status=status,
     )
 
 
 def _score_move_row(r: RowMove) -> float:
-    """간단한 기대대미지 점수: bp * acc * (1.5 if STAB). (효과抜群 계산은 생략)"""
-    return (r.base_power or 0) * max(0.0, min(1.0, r.accuracy or 0.0)) * (1.5 if r.is_stab else 1.0)
+    """간단한 기대대미지 점수: bp * acc * (1.5 if STAB) * 타입 상성."""
+    return (
+        (r.base_power or 0)
+        * max(0.0, min(1.0, r.accuracy or 0.0))
+        * (1.5 if r.is_stab else 1.0)
+        * r.effectiveness
+    )
+
+
+def _score_loop(bp, acc, stab, eff):
+    out = np.empty(bp.shape[0], dtype=np.float32)
+    for i in range(bp.shape[0]):
+        out[i] = bp[i] * acc[i] * (1.5 if stab[i] else 1.0) * eff[i]
+    return out
+
+
+def _score_vec(bp, acc, stab, eff):
+    return bp * acc * np.where(stab, np.float32(1.5), np.float32(1.0)) * eff
+
+
+# numba 있으면 JIT (cache=True → 컴파일은 첫 실행 한 번만), 없으면 numpy 벡터 연산
+if np is not None and njit is not None:
+    _score_arrays = njit(cache=True, fastmath=True)(_score_loop)
+else:
+    _score_arrays = _score_vec
+
+# 이보다 적은 기술 수는 list comprehension이 더 빠름 (배열 생성 + 커널 호출 비용).
+# 싱글 배틀 한 턴은 최대 4개라 실제 배틀에선 항상 list 경로; 배열/커널은 대량 입력용
+_VECTOR_MIN = 16
+
+
+def _score_moves(move_rows: List[RowMove]):
+    """_score_move_row를 전체 기술에 한 번에 적용 (기술이 많고 numpy 있으면 float32 배열, 아니면 list)."""
+    if np is None or len(move_rows) < _VECTOR_MIN:
+        return [_score_move_row(r) for r in move_rows]
+    n = len(move_rows)
+    bp = np.fromiter((r.base_power or 0 for r in move_rows), dtype=np.float32, count=n)
+    acc = np.fromiter((max(0.0, min(1.0, r.accuracy or 0.0)) for r in move_rows), dtype=np.float32, count=n)
+    stab = np.fromiter((bool(r.is_stab) for r in move_rows), dtype=np.bool_, count=n)
+    eff = np.fromiter((r.effectiveness for r in move_rows), dtype=np.float32, count=n)
+    return _score_arrays(bp, acc, stab, eff)
+
+
+def _best_move_index(move_rows: List[RowMove]) -> int:
+    """기대대미지 최대 기술 index (동점이면 앞쪽)."""
+    scores = _score_moves(move_rows)
+    if isinstance(scores, list):
+        return max(range(len(scores)), key=scores.__getitem__)
+    return int(scores.argmax())
+
+
+def _dominant_index(scores, ratio: float = 2.0) -> Optional[int]:
+    """
+    공격기(점수 > 0) 중 1등이 2등의 ratio배 이상이면 그 index (LLM이 기대대미지로 더 잘 고를 수 없음).
+    변화기는 점수가 0이라 비교에서 제외 → 공격기가 2개 미만이면 변화기와의 선택이라 LLM에 맡김.
+    """
+    damaging = [i for i in range(len(scores)) if scores[i] > 0]
+    if len(damaging) < 2:
+        return None
+    damaging.sort(key=lambda i: -scores[i])
+    best, second = float(scores[damaging[0]]), float(scores[damaging[1]])
+    if best / second >= ratio:
+        return damaging[0]
+    return None
+
+
+def _score_switch_row(r: RowSwitch, opp_types: Sequence[str] = ()) -> float:
+    """
+    간단한 교체 유틸리티: 남은 HP - 상태이상 패널티 + 방어 상성.
+    방어 상성: 상대 타입(자속기 가정) 중 가장 아픈 배율 기준 (무효 +25, 반감 +12.5, 약점 -25, 4배 -75).
+    """
+    incoming = max((effectiveness(t, r.types) for t in opp_types), default=1.0)
+    return (r.hp_pct or 0) - (25 if r.status else 0) + 25 * (1.0 - incoming)
+
+
+def _top_k(scores, k: int) -> List[int]:
+    """점수 높은 순 상위 k개의 원래 index. 후보가 k개 이하(또는 k<=0)면 순서 그대로."""
+    n = len(scores)
+    if k <= 0 or n <= k:
+        return list(range(n))
+    return sorted(range(n), key=lambda i: -scores[i])[:k]
+
+
+def _unmap_index(dec: dict, idx_map: Dict[str, List[int]]) -> dict:
+    """LLM이 본 (잘린) 후보 index → 원래 moves[] / switches[] index."""
+    kind = "switch" if dec["action"] == "switch" else "move"
+    return {**dec, "index": idx_map[kind][dec["index"]]}
+
+
+_JSON_SPAN_RE = re.compile(r"\{.*\}", re.S)  # 첫 '{' ~ 마지막 '}'
 
 
 def _extract_json(text: str) -> Dict[str, Any]:
@@ -218,35 +529,84 @@ def _extract_json(text: str) -> Dict[str, Any]:
     text = (text or "").strip()
     # 1) 깔끔한 JSON만 온 경우
     try:
-        obj = json.loads(text)
+        obj = _loads(text)
+        if isinstance(obj, dict):
+            return obj
+    except Exception:
+        pass
+
+    # 2) 코드펜스/앞뒤 설명만 붙은 경우: 바깥 중괄호 구간 한 번에
+    m = _JSON_SPAN_RE.search(text)
+    if m is None:
+        raise ValueError("no_json_object_found")
+    try:
+        obj = _loads(m.group(0))
         if isinstance(obj, dict):
             return obj
     except Exception:
         pass
 
-    # 2) 안에 JSON 섞여있는 경우: 여는 중괄호 위치마다 시도
-    for start in range(len(text)):
-        if text[start] != "{":
-            continue
-        depth = 0
-        for end in range(start, len(text)):
-            ch = text[end]
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    chunk = text[start : end + 1]
-                    try:
-                        obj = json.loads(chunk)
-                        if isinstance(obj, dict):
-                            return obj
-                    except Exception:
-                        pass
-                    break
+    # 3) 여러 덩어리가 섞인 경우: 한 번만 훑으면서 균형 맞는 {...}마다 시도
+    depth = 0
+    start = -1
+    for i in range(m.start(), m.end()):
+        ch = text[i]
+        if ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                try:
+                    obj = _loads(text[start : i + 1])
+                    if isinstance(obj, dict):
+                        return obj
+                except Exception:
+                    pass
     raise ValueError("no_json_object_found")
 
 
+async def _read_first_object(stream) -> str:
+    """
+    스트리밍 응답을 읽다가 첫 JSON 오브젝트의 '}'가 닫히는 순간 연결을 끊음.
+    (필요한 JSON은 ~25토큰인데 max_tokens까지 기다릴 필요 없음)
+    """
+    parts: List[str] = []
+    depth = 0
+    opened = False
+    in_str = False
+    esc = False
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content or ""
+            if not piece:
+                continue
+            parts.append(piece)
+            for ch in piece:
+                if in_str:
+                    if esc:
+                        esc = False
+                    elif ch == "\\":
+                        esc = True
+                    elif ch == '"':
+                        in_str = False
+                elif ch == '"':
+                    in_str = opened
+                elif ch == "{":
+                    depth += 1
+                    opened = True
+                elif ch == "}" and depth > 0:
+                    depth -= 1
+            if opened and depth == 0:
+                break
+    finally:
+        await stream.close()  # 남은 토큰은 받지 않고 HTTP 연결 정리
+    return "".join(parts)
+
+
 def _validate_decision(dec: dict, rows: List[dict], state: dict) -> Tuple[bool, str]:
     if not isinstance(dec, dict):
         return False, "not_dict"
@@ -272,6 +632,120 @@ def _validate_decision(dec: dict, rows: List[dict], state: dict) -> Tuple[bool,
     return True, ""
 
 
+# =========================
+# 시스템 프롬프트
+# =========================
+
+# OpenAI 프롬프트 캐시는 1024토큰 이상 동일한 prefix에만 걸림.
+# → 규칙/스키마/예시는 전부 여기 고정 문자열로 두고, 턴마다 바뀌는 값은 절대 넣지 않음
+#   (동적 데이터는 user 메시지의 {"state", "candidates"} JSON에만).
+SYS_PROMPT = """You are a Pokémon battle assistant. Choose exactly one action from the candidates.
+
+## Input
+Each user message is a single JSON object with two keys:
+- "state": the current battle situation.
+  - "turn": current turn number (integer).
+  - "force_switch": true when the active Pokémon fainted or must leave the field. In that case only switches are legal.
+  - "my_active" / "opp_active": {"species", "types", "hp_pct", "status"} of the two active Pokémon.
+    "types" are upper-case type names (e.g. "FIRE", "WATER"). "hp_pct" is 0-100 (null if unknown).
+    "status" is one of BRN, FRZ, PAR, PSN, SLP, TOX or null.
+  - "weather": active weather name or "none".
+  - "terrain": active terrain name or "none".
+  - "truncated_from": only present when weaker candidates were left out; the number of legal actions before pruning.
+- "candidates": the legal actions for this turn, as a list of rows.
+  - Move rows: {"kind":"move","index","id","name","type","base_power","accuracy","priority","category","pp","is_stab","effectiveness"}
+    "index" is the 0-based position among the move rows only.
+    "accuracy" is 0.0-1.0. "is_stab" is true when the move type matches one of my active Pokémon's types.
+    "effectiveness" is the type multiplier against the opposing active Pokémon (0, 0.25, 0.5, 1, 2 or 4).
+  - Switch rows: {"kind":"switch","index","species","types","hp_pct","status"}
+    "index" is the 0-based position among the switch rows only.
+
+## Rules
+1. Only choose an action that appears in "candidates". Never invent an index.
+2. Move indices and switch indices are counted separately. The first move is move index 0 and the first switch is switch index 0.
+3. If state.force_switch is true, you MUST choose switch/force_switch. Use {"action":"switch","index":<switch index>}.
+4. Prefer higher expected damage ≈ base_power * accuracy * (1.5 if is_stab else 1) * effectiveness.
+   A move with effectiveness 0 does nothing to the opponent; never choose it to deal damage.
+5. Moves with base_power 0 deal no direct damage. Only pick them when no damaging move is available or when the situation clearly favours setup or recovery.
+6. Consider switching out when my active Pokémon is at low HP and a healthy teammate is available, or when every move has very low expected damage.
+7. Prefer switch targets with high hp_pct and no major status condition (SLP, FRZ, PAR, TOX, BRN, PSN).
+8. Positive "priority" moves act first. A priority move can finish an opponent with low hp_pct before it attacks.
+9. Avoid moves with pp 0; they are not usable.
+10. Keep "reason" short (under ten words). Do not explain the rules back.
+
+## Output format
+Reply with ONLY this JSON: {"action":"move|switch|force_switch","index":0-based integer,"reason":"short"}
+- No code fences, no markdown, no text before or after the JSON object.
+- "action" must be exactly "move", "switch" or "force_switch".
+- "index" must be an integer, never a string or a name.
+
+## Batched requests
+Sometimes the user message is {"batch":[{"state":...,"candidates":[...]}, ...]} holding several independent battles.
+Decide each entry on its own with the same rules and reply with {"decisions":[...]}:
+exactly one decision object per batch entry, in the same order. Indices always refer to that entry's own candidates.
+
+## Examples
+
+Example 1 (pick the strongest STAB move)
+Input:
+{"state":{"turn":1,"force_switch":false,"my_active":{"species":"sandslash","types":["GROUND"],"hp_pct":100,"status":null},"opp_active":{"species":"volcanion","types":["FIRE","WATER"],"hp_pct":100,"status":null},"weather":"none","terrain":"none"},"candidates":[{"kind":"move","index":0,"id":"earthquake","name":"earthquake","type":"GROUND","base_power":100,"accuracy":1.0,"priority":0,"category":"PHYSICAL","pp":16,"is_stab":true,"effectiveness":2.0},{"kind":"move","index":1,"id":"rapidspin","name":"rapidspin","type":"NORMAL","base_power":50,"accuracy":1.0,"priority":0,"category":"PHYSICAL","pp":64,"is_stab":false,"effectiveness":1.0},{"kind":"move","index":2,"id":"stoneedge","name":"stoneedge","type":"ROCK","base_power":100,"accuracy":0.8,"priority":0,"category":"PHYSICAL","pp":8,"is_stab":false,"effectiveness":2.0},{"kind":"switch","index":0,"species":"amoonguss","types":["GRASS","POISON"],"hp_pct":100,"status":null}]}
+Output:
+{"action":"move","index":0,"reason":"highest damage with STAB"}
+
+Example 2 (forced switch after a faint)
+Input:
+{"state":{"turn":7,"force_switch":true,"my_active":{"species":"sandslash","types":["GROUND"],"hp_pct":0,"status":null},"opp_active":{"species":"volcanion","types":["FIRE","WATER"],"hp_pct":62,"status":null},"weather":"none","terrain":"none"},"candidates":[{"kind":"switch","index":0,"species":"amoonguss","types":["GRASS","POISON"],"hp_pct":100,"status":null},{"kind":"switch","index":1,"species":"baxcalibur","types":["DRAGON","ICE"],"hp_pct":35,"status":"PAR"}]}
+Output:
+{"action":"switch","index":0,"reason":"forced switch, healthiest teammate"}
+
+Example 3 (finish a weakened opponent with priority)
+Input:
+{"state":{"turn":12,"force_switch":false,"my_active":{"species":"scizor","types":["BUG","STEEL"],"hp_pct":20,"status":null},"opp_active":{"species":"gengar","types":["GHOST","POISON"],"hp_pct":9,"status":null},"weather":"none","terrain":"none"},"candidates":[{"kind":"move","index":0,"id":"bulletpunch","name":"bulletpunch","type":"STEEL","base_power":40,"accuracy":1.0,"priority":1,"category":"PHYSICAL","pp":48,"is_stab":true,"effectiveness":1.0},{"kind":"move","index":1,"id":"uturn","name":"uturn","type":"BUG","base_power":70,"accuracy":1.0,"priority":0,"category":"PHYSICAL","pp":32,"is_stab":true,"effectiveness":0.25}]}
+Output:
+{"action":"move","index":0,"reason":"priority move finishes low HP target"}
+
+Example 4 (retreat a nearly fainted Pokémon)
+Input:
+{"state":{"turn":9,"force_switch":false,"my_active":{"species":"amoonguss","types":["GRASS","POISON"],"hp_pct":8,"status":"TOX"},"opp_active":{"species":"baxcalibur","types":["DRAGON","ICE"],"hp_pct":100,"status":null},"weather":"none","terrain":"none"},"candidates":[{"kind":"move","index":0,"id":"spore","name":"spore","type":"GRASS","base_power":0,"accuracy":1.0,"priority":0,"category":"STATUS","pp":16,"is_stab":true,"effectiveness":0.5},{"kind":"move","index":1,"id":"gigadrain","name":"gigadrain","type":"GRASS","base_power":75,"accuracy":1.0,"priority":0,"category":"SPECIAL","pp":16,"is_stab":true,"effectiveness":0.5},{"kind":"switch","index":0,"species":"scizor","types":["BUG","STEEL"],"hp_pct":90,"status":null}]}
+Output:
+{"action":"switch","index":0,"reason":"low HP, healthy teammate available"}
+"""
+
+
+# Structured Outputs: 서버가 스키마에 맞는 JSON만 내보내도록 강제
+# (strict 모드는 모든 property가 required + additionalProperties=false 여야 함)
+_DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string", "enum": ["move", "switch", "force_switch"]},
+        "index": {"type": "integer", "minimum": 0},
+        "reason": {"type": "string"},
+    },
+    "required": ["action", "index", "reason"],
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "decision", "strict": True, "schema": _DECISION_SCHEMA},
+}
+
+# 여러 배틀을 한 번에 물어볼 때: {"decisions": [decision, ...]} (입력 batch 순서대로)
+BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "decisions",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"decisions": {"type": "array", "items": _DECISION_SCHEMA}},
+            "required": ["decisions"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
 # =========================
 # LLM 플레이어
 # =========================
@@ -283,20 +757,58 @@ class LLMPlayer(Player):
     - TRACE_FILE 설정 시 JSONL 이벤트 기록
     """
 
-    def __init__(self, model: Optional[str] = None, debug: bool = False, **kwargs):
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        debug: bool = False,
+        batcher: Optional[RequestBatcher] = None,
+        batch: Optional[bool] = None,
+        **kwargs,
+    ):
         super().__init__(**kwargs)
+        if LLM_JIT_WARMUP:
+            _warm_kernels()
         self.model = model or OPENAI_MODEL
         self.debug = bool(debug)
 
         self._client = None
-        if OPENAI_KEY and OpenAI is not None:
+        if OPENAI_KEY and AsyncOpenAI is not None:
             try:
-                self._client = OpenAI(api_key=OPENAI_KEY)
+                self._client = AsyncOpenAI(api_key=OPENAI_KEY, http_client=_shared_http_client())
             except Exception:
                 self._client = None
 
+        # 결정 캐시 키 salt: 모델/프롬프트/seed가 바뀌면 예전 결정은 재사용하지 않음
+        self._cache_salt = hashlib.blake2b(
+            f"{self.model}\0{LLM_SEED}\0{SYS_PROMPT}".encode("utf-8"), digest_size=16
+        ).digest()
+
+        # 동시에 들어온 결정 요청 묶기 (여러 플레이어가 batcher 하나를 공유해도 됨)
+        # batch=None: 이 플레이어가 배틀을 여러 개 동시에 돌릴 때만 (혼자면 대기 창만큼 손해)
+        if batch is None:
+            batch = self._max_concurrent_battles > 1
+        # (요청 항목에 주인 플레이어를 같이 넣으므로 공유해도 각자의 client/model/user로 나감)
+        if batcher is None and batch and LLM_BATCH_WINDOW_MS > 0:
+            batcher = RequestBatcher(
+                LLMPlayer._send_one,
+                LLMPlayer._send_batch,
+                window=LLM_BATCH_WINDOW_MS / 1000.0,
+                max_batch=LLM_BATCH_MAX,
+            )
+        self._batcher = batcher
+
+        # 배틀별 진행 중인 LLM 결정 태스크 (battle_tag → Task)
+        self._inflight: Dict[Optional[str], asyncio.Task] = {}
+
+    @property
+    def batcher(self) -> Optional[RequestBatcher]:
+        """다른 LLMPlayer에 넘겨서 요청 묶음을 공유할 때 사용."""
+        return self._batcher
+
     # -------- 핵심: 선택 --------
-    def choose_move(self, battle: Battle):
+    async def choose_move(self, battle: Battle):
+        # poke-env는 choose_move가 awaitable을 돌려주면 이벤트 루프 안에서 await 해줌
+        # → LLM 왕복 동안에도 웹소켓/다른 배틀이 계속 진행됨
         me_active: Optional[Pokemon] = getattr(battle, "active_pokemon", None)
         opp_active: Optional[Pokemon] = getattr(battle, "opponent_active_pokemon", None)
 
@@ -304,22 +816,35 @@ class LLMPlayer(Player):
         moves = list(getattr(battle, "available_moves", []) or [])
         switches = list(getattr(battle, "available_switches", []) or [])
 
+        # 같은 포켓몬의 타입/HP/상태는 이번 턴 안에서 한 번만 계산 (id(p) 기준)
+        mon_cache: Dict[int, Tuple[Tuple[str, ...], int, Optional[str]]] = {}
+
+        def mon_info(p: Pokemon) -> Tuple[Tuple[str, ...], int, Optional[str]]:
+            info = mon_cache.get(id(p))
+            if info is None:
+                info = mon_cache[id(p)] = _mon_info(p)
+            return info
+
+        my_types = frozenset(mon_info(me_active)[0]) if me_active else frozenset()
+        opp_types = mon_info(opp_active)[0] if opp_active else ()
+        effs = effectiveness_many([_move_type(m) for m in moves], opp_types)
         move_rows: List[RowMove] = [
-            _move_row(i, m, me_active) for i, m in enumerate(moves)
+            _move_row(i, m, my_types, effs[i]) for i, m in enumerate(moves)
         ]
         switch_rows: List[RowSwitch] = [
-            _switch_row(i, p) for i, p in enumerate(switches)
+            _switch_row(i, p, mon_info(p)) for i, p in enumerate(switches)
         ]
 
         # 상태 요약
         def dump_mon(p: Optional[Pokemon]) -> Dict[str, Any]:
             if not p:
                 return {"species": "unknown", "types": [], "hp_pct": None, "status": None}
+            types, hp, status = mon_info(p)
             return {
                 "species": (getattr(p, "species", getattr(p, "name", "unknown")) or "unknown").lower(),
-                "types": _safe_types(p),
-                "hp_pct": _hp_pct(p),
-                "status": _status(p),
+                "types": list(types),
+                "hp_pct": hp,
+                "status": status,
             }
 
         weather = getattr(battle, "weather", None)
@@ -334,6 +859,40 @@ class LLMPlayer(Player):
             "terrain": terrain.name if getattr(terrain, "name", None) else "none",
         }
 
+        # 후보 가지치기: 휴리스틱 상위 K개만 LLM에 보냄 (토큰 ↓ → 지연/비용 ↓)
+        move_scores = _score_moves(move_rows)
+        idx_map = {
+            "move": _top_k(move_scores, LLM_TOP_K_MOVES),
+            "switch": _top_k([_score_switch_row(r, opp_types) for r in switch_rows], LLM_TOP_K_SWITCHES),
+        }
+        n_rows = len(move_rows) + len(switch_rows)
+        if len(idx_map["move"]) + len(idx_map["switch"]) < n_rows:
+            state["truncated_from"] = n_rows
+
+        # LLM 의사결정 → 실패 시 폴백
+        rows_for_llm: List[Dict[str, Any]] = [
+            {**move_rows[i].to_dict(), "index": j} for j, i in enumerate(idx_map["move"])
+        ] + [
+            {**switch_rows[i].to_dict(), "index": j} for j, i in enumerate(idx_map["switch"])
+        ]
+
+        # 압도적인 기술이 하나 있으면 LLM 호출 자체를 생략 (공짜 가지치기)
+        dec: Optional[Dict[str, Any]] = None
+        if LLM_DOMINANT_SKIP and not state["force_switch"]:
+            best_i = _dominant_index(move_scores)
+            if best_i is not None:
+                dec = {"action": "move", "index": best_i, "reason": "dominant:expected-damage"}
+                if _TRACE_ENABLED:
+                    _trace("dominant_skip", turn=state.get("turn"), dec=dec, state=state)
+
+        # 화면 출력이 있으면 LLM 요청을 먼저 띄우고 (추측 실행), 출력은 요청이 오가는 동안 처리.
+        # none 모드는 겹칠 게 없고, 프롬프트 디버그 출력(debug + full)은 턴/테이블 뒤에 나와야 하므로 출력 후 시작
+        overlap = LOG_MODE == "compact" or (LOG_MODE == "full" and not self.debug)
+        task: Optional[asyncio.Task] = None
+        if dec is None and overlap:
+            task = self._start_decision(battle, state, rows_for_llm)
+            await asyncio.sleep(0)  # 태스크가 첫 네트워크 I/O까지 진행하도록 한 번 양보
+
         # 화면 출력 (compact)
         if LOG_MODE in ("compact", "full"):
             if state["turn"] <= 1 or state["force_switch"]:
@@ -344,38 +903,48 @@ class LLMPlayer(Player):
                 f"Weather: {state['weather']} Terrain: {state['terrain']}"
             )
 
-        # 테이블 출력
-        if LOG_MODE in ("compact", "full"):
+        # 테이블 출력 (full 모드만)
+        if LOG_MODE == "full" and Table is not None:
             try:
-                from rich.table import Table
-                from rich.console import Console
-
-                table = Table("kind", "idx", "name/species", "type(s)", "bp", "acc", "stab")
+                table = Table("kind", "idx", "name/species", "type(s)", "bp", "acc", "stab", "eff")
                 for r in move_rows:
-                    table.add_row("move", str(r.index), r.name, r.type, str(r.base_power), f"{r.accuracy:.1f}", "✓" if r.is_stab else "")
+                    table.add_row("move", str(r.index), r.name, r.type, str(r.base_power), f"{r.accuracy:.1f}", "✓" if r.is_stab else "", f"x{r.effectiveness:g}")
                 for r in switch_rows:
                     ts = "/".join(r.types) if r.types else "-"
-                    table.add_row("switch", str(r.index), r.species, ts, "-", "-", "-")
-                Console().print(table)
+                    table.add_row("switch", str(r.index), r.species, ts, "-", "-", "-", "-")
+                _CONSOLE.print(table)
             except Exception:
                 pass
 
-        # LLM 의사결정 → 실패 시 폴백
-        rows_for_llm: List[Dict[str, Any]] = [asdict(r) for r in move_rows] + [asdict(r) for r in switch_rows]
+        if dec is None and task is None:
+            task = self._start_decision(battle, state, rows_for_llm)
 
-        try:
-            dec = self._llm_decide(state, rows_for_llm)
-        except Exception as e:
-            # 폴백: 강제 교대 상황이면 첫 스위치, 아니면 기대대미지 최대 무브
-            if state["force_switch"] and switch_rows:
-                dec = {"action": "switch", "index": 0, "reason": f"fallback:force_switch ({e})"}
-            elif move_rows:
-                best_i = max(range(len(move_rows)), key=lambda i: _score_move_row(move_rows[i]))
-                dec = {"action": "move", "index": best_i, "reason": f"fallback:expected-damage ({e})"}
-            else:
-                # 정말 아무것도 없으면 대충
-                dec = {"action": "move", "index": 0, "reason": f"fallback:default ({e})"}
-            _trace("fallback_exception", turn=state.get("turn"), error=str(e), dec=dec, state=state)
+        if task is not None:
+            try:
+                dec = await asyncio.wait_for(task, timeout=LLM_TIMEOUT)
+                dec = _unmap_index(dec, idx_map)
+            except asyncio.CancelledError:
+                # 같은 배틀에 새 request가 와서 이 결정이 밀려난 경우 (_start_decision 참고):
+                # 새 choose_move가 응답하므로 여기선 낡은 주문을 보내지 않고 조용히 끝냄
+                me = asyncio.current_task()
+                newer = self._inflight.get(getattr(battle, "battle_tag", None))
+                if not task.cancelled() or newer in (None, task) or (me is not None and me.cancelling()):
+                    raise
+                self.logger.debug("Dropped stale decision for %s (turn %s)", battle.battle_tag, state["turn"])
+                return _NO_ORDER
+            except Exception as e:
+                err = str(e) or type(e).__name__  # TimeoutError는 메시지가 비어있음
+                # 폴백: 강제 교대 상황이면 첫 스위치, 아니면 기대대미지 최대 무브
+                if state["force_switch"] and switch_rows:
+                    dec = {"action": "switch", "index": 0, "reason": f"fallback:force_switch ({err})"}
+                elif move_rows:
+                    best_i = _best_move_index(move_rows)
+                    dec = {"action": "move", "index": best_i, "reason": f"fallback:expected-damage ({err})"}
+                else:
+                    # 정말 아무것도 없으면 대충
+                    dec = {"action": "move", "index": 0, "reason": f"fallback:default ({err})"}
+                if _TRACE_ENABLED:
+                    _trace("fallback_exception", turn=state.get("turn"), error=err, dec=dec, state=state)
 
         # 결정 출력
         if LOG_MODE in ("compact", "full"):
@@ -402,64 +971,163 @@ class LLMPlayer(Player):
             return self.create_order(moves[0])
         return self.choose_random_move(battle)
 
+    def _start_decision(self, battle: Battle, state: dict, rows: List[dict]) -> asyncio.Task:
+        """
+        LLM 결정을 태스크로 먼저 시작.
+        신선도 체크: 같은 배틀에 아직 안 끝난 이전 요청이 있으면 (그 사이 서버가 새 request를 보냄)
+        그 결과는 낡은 상태 기준이므로 취소.
+        """
+        tag = getattr(battle, "battle_tag", None)
+        prev = self._inflight.get(tag)
+        if prev is not None and not prev.done():
+            prev.cancel()
+        task = asyncio.get_running_loop().create_task(self._llm_decide(state, rows))
+        self._inflight[tag] = task
+
+        def _done(t: asyncio.Task, tag=tag):
+            if self._inflight.get(tag) is t:
+                del self._inflight[tag]
+
+        task.add_done_callback(_done)
+        return task
+
+    # -------- 프롬프트 직렬화 --------
+    def _user_content(self, state: dict, rows: List[dict]) -> str:
+        """user 메시지 본문: {"state": ..., "candidates": [...]}."""
+        return _dumps({"state": state, "candidates": rows})
+
     # -------- LLM 호출+검증 --------
-    def _llm_decide(self, state: dict, rows: List[dict]) -> dict:
+    async def _llm_decide(self, state: dict, rows: List[dict]) -> dict:
         # 테스트용: 일부러 나쁜 출력 유도
         if os.getenv("LLM_FORCE_BAD_OUTPUT") == "1":
             if self.debug and LOG_MODE == "full":
                 print("[LLM] (forced) RAW OUTPUT: MOVE 1")
-            _trace("llm_forced_bad", turn=state.get("turn"))
+            if _TRACE_ENABLED:
+                _trace("llm_forced_bad", turn=state.get("turn"))
             raise ValueError("forced_bad_output")
 
+        # 완전히 같은 상황을 본 적 있으면 네트워크 생략
+        cache = _decision_cache()
+        key = decision_key(state, rows, self._cache_salt) if cache is not None else None
+        if cache is not None:
+            hit = cache.get(key)
+            if hit is not None:
+                if _TRACE_ENABLED:
+                    _trace("cache_hit", turn=state.get("turn"), parsed=hit, state=state)
+                return {**hit, "reason": f"cache:{hit.get('reason', '')}"}
+
+        # 정확히 같진 않아도 거의 같은 턴이면 그 결정 재사용
+        sem = _semantic_cache()
+        if sem is not None:
+            near = sem.get(state, rows, self._cache_salt)
+            if near is not None:
+                hit, sim = near
+                if _TRACE_ENABLED:
+                    _trace("semantic_hit", turn=state.get("turn"), similarity=sim, parsed=hit, state=state)
+                return {**hit, "reason": f"semantic:{hit.get('reason', '')}"}
+
         # 키 없으면 폴백 루트로 위에서 처리
         if not self._client:
             # 여기선 raise해서 상위 폴백 경로로 보냄
             raise RuntimeError("no_openai_client")
 
-        sys_prompt = (
-            "You are a Pokémon battle assistant. Choose exactly one action from the candidates.\n"
-            "Prefer higher expected damage ≈ base_power * accuracy * (1.5 if is_stab else 1). "
-            "If state.force_switch is true, you MUST choose switch/force_switch.\n"
-            'Reply with ONLY this JSON: {"action":"move|switch|force_switch","index":0-based integer,"reason":"short"}'
-        )
         user_msg = {"state": state, "candidates": rows}
 
         if self.debug and LOG_MODE == "full":
             print("[LLM] === PROMPT ===")
             try:
-                print("You are a Pokémon battle assistant. Choose exactly one action from the candidates. Reply with a single JSON object ONLY: {\"action\":\"move|switch|force_switch\",\"index\":0-based integer,\"reason\":\"short\"}")
+                print(SYS_PROMPT.split("\n\n", 1)[0], f"(+ static rules/examples, {len(SYS_PROMPT)} chars)")
                 print(json.dumps(user_msg, ensure_ascii=False, indent=2))
             except Exception:
                 print(user_msg)
             print("[LLM] ===============")
 
-        # 실제 호출
-        resp = self._client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": json.dumps(user_msg, ensure_ascii=False)},
-            ],
-            temperature=0.15,
-            max_tokens=128,
-        )
-        raw = resp.choices[0].message.content or ""
+        # 실제 호출 (batcher 있으면 같은 창에 들어온 다른 배틀 요청과 묶어서)
+        # (다른 모델 요청과는 섞이지 않도록 model을 묶음 key로)
+        if self._batcher is not None:
+            raw = await self._batcher.submit((self, state, rows), key=self.model)
+        else:
+            raw = await self._request_one(state, rows)
 
         if self.debug and LOG_MODE == "full":
             print("[LLM] RAW OUTPUT:", raw)
 
-        # 파싱
+        # 파싱 (스키마 강제라 보통 첫 _loads에서 끝남, 스트림 중간 끊김 대비로 _extract_json)
         try:
             dec = _extract_json(raw)
         except Exception as e:
-            _trace("llm_bad_json", turn=state.get("turn"), raw=raw, error=str(e), state=state)
+            if _TRACE_ENABLED:
+                _trace("llm_bad_json", turn=state.get("turn"), raw=raw, error=str(e), state=state)
             raise
 
-        # 스키마 검증
+        # 범위 검증 (index가 실제 후보 안에 있는지)
         ok, err = _validate_decision(dec, rows, state)
         if not ok:
-            _trace("llm_bad_decision", turn=state.get("turn"), raw=raw, parsed=dec, error=err, state=state, rows=rows)
+            if _TRACE_ENABLED:
+                _trace("llm_bad_decision", turn=state.get("turn"), raw=raw, parsed=dec, error=err, state=state, rows=rows)
             raise ValueError(err)
 
-        _trace("llm_ok", turn=state.get("turn"), raw=raw, parsed=dec, state=state, rows=rows)
+        if _TRACE_ENABLED:
+            _trace("llm_ok", turn=state.get("turn"), raw=raw, parsed=dec, state=state, rows=rows)
+        if cache is not None:
+            cache.put(key, dec)
+        if sem is not None:
+            sem.put(state, rows, dec, self._cache_salt)
         return dec
+
+    # -------- batcher 진입점 (항목 = (주인 플레이어, state, rows)) --------
+    @staticmethod
+    async def _send_one(item: Tuple["LLMPlayer", dict, List[dict]]) -> str:
+        player, state, rows = item
+        return await player._request_one(state, rows)
+
+    @staticmethod
+    async def _send_batch(items: List[Tuple["LLMPlayer", dict, List[dict]]]) -> List[str]:
+        # 같은 key(model)끼리만 묶이므로 첫 항목 플레이어의 client로 보내도 모델은 같음
+        return await items[0][0]._request_batch(items)
+
+    async def _request_one(self, state: dict, rows: List[dict]) -> str:
+        """단일 요청: 스트리밍으로 받다가 JSON이 닫히면 바로 끊음."""
+        resp = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYS_PROMPT},
+                {"role": "user", "content": self._user_content(state, rows)},
+            ],
+            temperature=0,
+            top_p=1,
+            seed=LLM_SEED,
+            max_tokens=128,
+            response_format=RESPONSE_FORMAT,
+            user=self.username,
+            stream=True,
+        )
+        return await _read_first_object(resp)
+
+    async def _request_batch(self, items: List[Tuple["LLMPlayer", dict, List[dict]]]) -> List[str]:
+        """
+        묶음 요청: {"batch":[...]} 한 번 보내고 {"decisions":[...]}를 항목별 raw JSON으로 나눠 돌려줌.
+        user=는 전부 이 플레이어 항목일 때만 (여러 플레이어가 섞인 묶음은 한 명의 캐시 구획에 넣지 않음)
+        """
+        content = '{"batch":[' + ",".join(self._user_content(s, r) for _, s, r in items) + "]}"
+        extra = {"user": self.username} if all(p is self for p, _, _ in items) else {}
+        resp = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYS_PROMPT},
+                {"role": "user", "content": content},
+            ],
+            temperature=0,
+            top_p=1,
+            seed=LLM_SEED,
+            max_tokens=128 * len(items),
+            response_format=BATCH_RESPONSE_FORMAT,
+            **extra,
+        )
+        raw = resp.choices[0].message.content or ""
+        decisions = _extract_json(raw).get("decisions")
+        if not isinstance(decisions, list):
+            raise ValueError("batch_without_decisions")
+        if _TRACE_ENABLED:
+            _trace("llm_batch", size=len(items), raw=raw)
+        return [_dumps(d) for d in decisions]
@@ -5,6 +5,8 @@ LLM vs Random test script
 - Designed to test LLM-driven decision making via the OpenAI API, with future plans
   to migrate toward local inference instead of API calls.
 - Supports command-line arguments (--battles, --format, --host, --port, etc.) to configure battles.
+- --parallelism P runs P LLM/Random pairs concurrently (battles split across pairs) so
+  LLM latency overlaps instead of adding up.
 - Can run on both local and public Showdown servers.
 - Optionally prints or opens a spectator URL for live battle observation.
 """
@@ -70,6 +72,7 @@ async def run(
     port=8000,
     debug_llm=False,
     open_browser=False,
+    parallelism=1,
 ):
     # 서버 설정
     if host in ("localhost", "127.0.0.1") and port == 8000:
@@ -79,22 +82,38 @@ async def run(
         auth_url = "https://play.pokemonshowdown.com/action.php?"
         server = ServerConfiguration(ws_url, auth_url)
 
-    me = LLMPlayer(
-        battle_format=fmt,
-        max_concurrent_battles=1,
-        server_configuration=server,
-        start_timer_on_battle_start=True,
-        debug=debug_llm,
-    )
-    opp = RandomPlayer(
-        battle_format=fmt,
-        max_concurrent_battles=1,
-        server_configuration=server,
-    )
-    print(f"Start LLM({me.username}) vs Random({opp.username}) - {fmt}")
+    # P쌍의 (LLM, Random)을 동시에 돌림 → LLM 대기 시간이 겹쳐서 처리량 ↑
+    # 판 수는 쌍마다 나눠 배분 (나머지는 앞쪽 쌍부터 1판씩 더)
+    parallelism = max(1, min(int(parallelism), n_battles))
+    pairs = []
+    for i in range(parallelism):
+        me = LLMPlayer(
+            battle_format=fmt,
+            max_concurrent_battles=1,
+            server_configuration=server,
+            start_timer_on_battle_start=True,
+            debug=debug_llm,
+            # 같은 창에 들어온 요청은 플레이어가 달라도 한 번에 묶이도록 batcher 공유
+            # (1쌍이면 묶을 상대가 없으니 batcher 없이 바로 요청)
+            batcher=pairs[0][0].batcher if pairs else None,
+            batch=parallelism > 1,
+        )
+        opp = RandomPlayer(
+            battle_format=fmt,
+            max_concurrent_battles=1,
+            server_configuration=server,
+        )
+        n = n_battles // parallelism + (1 if i < n_battles % parallelism else 0)
+        pairs.append((me, opp, n))
+
+    me = pairs[0][0]
+    names = ", ".join(f"LLM({a.username}) vs Random({b.username})" for a, b, _ in pairs)
+    print(f"Start {names} - {fmt}")
     asyncio.create_task(_announce_room(me, host, port, open_browser))
-    await me.battle_against(opp, n_battles=n_battles)
-    print(f"Done. LLM won {me.n_won_battles} / lost {me.n_lost_battles}")
+    await asyncio.gather(*[a.battle_against(b, n_battles=n) for a, b, n in pairs])
+    won = sum(a.n_won_battles for a, _, _ in pairs)
+    lost = sum(a.n_lost_battles for a, _, _ in pairs)
+    print(f"Done. LLM won {won} / lost {lost}")
 
 
 if __name__ == "__main__":
@@ -105,6 +124,7 @@ if __name__ == "__main__":
     ap.add_argument("--port", type=int, default=8000)
     ap.add_argument("--debug-llm", action="store_true", help="LLM 상세 프롬프트/출력 보기 (full 모드와 함께 추천)")
     ap.add_argument("--open", action="store_true", help="관전 URL 자동으로 브라우저 열기")
+    ap.add_argument("--parallelism", type=int, default=1, help="동시에 돌릴 LLM/Random 쌍 수 (판 수를 나눠서 진행)")
     ap.add_argument("--log-mode", choices=["none", "compact", "full"], default=None)
     ap.add_argument("--quiet-lib-logs", action="store_true")
 
@@ -123,5 +143,6 @@ if __name__ == "__main__":
             port=args.port,
             debug_llm=args.debug_llm,
             open_browser=args.open,
+            parallelism=args.parallelism,
         )
     )
@@ -0,0 +1,131 @@
+"""
+Type chart module
+
+- Gen 6+ 18x18 type effectiveness chart stored as a compact int8 matrix
+  (codes 0/1/2/3 → x0 / x0.5 / x1 / x2).
+- effectiveness(): multiplier of one attacking type against a defender's types.
+- effectiveness_many(): the same for several attacking types at once (all moves
+  of the active Pokémon vs. the opposing active Pokémon).
+- The pure Python lookup is the production path: a singles turn has at most 4
+  moves, and for inputs that small it beats the array round-trip.
+- Inputs of 16+ move types (bulk analysis, not live battles) use a numba-compiled
+  kernel when numba is installed. warmup() compiles/loads it ahead of time; it is
+  opt-in (LLMPlayer calls it only with LLM_JIT_WARMUP=1).
+"""
+
+# ruff: noqa
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+try:
+    from numba import njit
+except Exception:  # pragma: no cover
+    njit = None  # type: ignore
+
+
+TYPES: Tuple[str, ...] = (
+    "NORMAL", "FIRE", "WATER", "ELECTRIC", "GRASS", "ICE",
+    "FIGHTING", "POISON", "GROUND", "FLYING", "PSYCHIC", "BUG",
+    "ROCK", "GHOST", "DRAGON", "DARK", "STEEL", "FAIRY",
+)
+TYPE_INDEX: Dict[str, int] = {t: i for i, t in enumerate(TYPES)}
+
+# code → 배율
+MULTIPLIERS: Tuple[float, ...] = (0.0, 0.5, 1.0, 2.0)
+
+# 공격 타입별 x1이 아닌 상성만 (나머지는 전부 x1)
+_NOT_NEUTRAL: Dict[str, Dict[str, float]] = {
+    "NORMAL": {"ROCK": 0.5, "GHOST": 0.0, "STEEL": 0.5},
+    "FIRE": {"FIRE": 0.5, "WATER": 0.5, "GRASS": 2.0, "ICE": 2.0, "BUG": 2.0, "ROCK": 0.5, "DRAGON": 0.5, "STEEL": 2.0},
+    "WATER": {"FIRE": 2.0, "WATER": 0.5, "GRASS": 0.5, "GROUND": 2.0, "ROCK": 2.0, "DRAGON": 0.5},
+    "ELECTRIC": {"WATER": 2.0, "ELECTRIC": 0.5, "GRASS": 0.5, "GROUND": 0.0, "FLYING": 2.0, "DRAGON": 0.5},
+    "GRASS": {
+        "FIRE": 0.5, "WATER": 2.0, "GRASS": 0.5, "POISON": 0.5, "GROUND": 2.0,
+        "FLYING": 0.5, "BUG": 0.5, "ROCK": 2.0, "DRAGON": 0.5, "STEEL": 0.5,
+    },
+    "ICE": {"FIRE": 0.5, "WATER": 0.5, "GRASS": 2.0, "ICE": 0.5, "GROUND": 2.0, "FLYING": 2.0, "DRAGON": 2.0, "STEEL": 0.5},
+    "FIGHTING": {
+        "NORMAL": 2.0, "ICE": 2.0, "POISON": 0.5, "FLYING": 0.5, "PSYCHIC": 0.5, "BUG": 0.5,
+        "ROCK": 2.0, "GHOST": 0.0, "DARK": 2.0, "STEEL": 2.0, "FAIRY": 0.5,
+    },
+    "POISON": {"GRASS": 2.0, "POISON": 0.5, "GROUND": 0.5, "ROCK": 0.5, "GHOST": 0.5, "STEEL": 0.0, "FAIRY": 2.0},
+    "GROUND": {"FIRE": 2.0, "ELECTRIC": 2.0, "GRASS": 0.5, "POISON": 2.0, "FLYING": 0.0, "BUG": 0.5, "ROCK": 2.0, "STEEL": 2.0},
+    "FLYING": {"ELECTRIC": 0.5, "GRASS": 2.0, "FIGHTING": 2.0, "BUG": 2.0, "ROCK": 0.5, "STEEL": 0.5},
+    "PSYCHIC": {"FIGHTING": 2.0, "POISON": 2.0, "PSYCHIC": 0.5, "DARK": 0.0, "STEEL": 0.5},
+    "BUG": {
+        "FIRE": 0.5, "GRASS": 2.0, "FIGHTING": 0.5, "POISON": 0.5, "FLYING": 0.5,
+        "PSYCHIC": 2.0, "GHOST": 0.5, "DARK": 2.0, "STEEL": 0.5, "FAIRY": 0.5,
+    },
+    "ROCK": {"FIRE": 2.0, "ICE": 2.0, "FIGHTING": 0.5, "GROUND": 0.5, "FLYING": 2.0, "BUG": 2.0, "STEEL": 0.5},
+    "GHOST": {"NORMAL": 0.0, "PSYCHIC": 2.0, "GHOST": 2.0, "DARK": 0.5},
+    "DRAGON": {"DRAGON": 2.0, "STEEL": 0.5, "FAIRY": 0.0},
+    "DARK": {"FIGHTING": 0.5, "PSYCHIC": 2.0, "GHOST": 2.0, "DARK": 0.5, "FAIRY": 0.5},
+    "STEEL": {"FIRE": 0.5, "WATER": 0.5, "ELECTRIC": 0.5, "ICE": 2.0, "ROCK": 2.0, "STEEL": 0.5, "FAIRY": 2.0},
+    "FAIRY": {"FIRE": 0.5, "FIGHTING": 2.0, "POISON": 0.5, "DRAGON": 2.0, "DARK": 2.0, "STEEL": 0.5},
+}
+
+# [공격 타입][방어 타입] → code (순수 파이썬 경로용 tuple-of-tuples)
+CHART: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(MULTIPLIERS.index(_NOT_NEUTRAL[a].get(d, 1.0)) for d in TYPES) for a in TYPES
+)
+
+
+def _eff_loop(chart, mults, move_idx, def_idx):
+    out = np.ones(move_idx.shape[0], dtype=np.float32)
+    for i in range(move_idx.shape[0]):
+        a = move_idx[i]
+        if a < 0:
+            continue
+        for t in def_idx:
+            out[i] *= mults[chart[a, t]]
+    return out
+
+
+if np is not None and njit is not None:
+    _CHART_NP = np.array(CHART, dtype=np.int8)
+    _MULTS_NP = np.array(MULTIPLIERS, dtype=np.float32)
+    _eff_kernel = njit(cache=True)(_eff_loop)
+else:
+    _eff_kernel = None
+
+# 이보다 적은 기술 수는 순수 파이썬이 더 빠름 (배열 생성 + 커널 호출 비용)
+_KERNEL_MIN = 16
+
+
+def _def_indices(def_types: Sequence[str]) -> List[int]:
+    """알 수 없는 타입(???, STELLAR 등)은 상성 계산에서 제외."""
+    return [TYPE_INDEX[t] for t in def_types if t in TYPE_INDEX]
+
+
+def effectiveness(move_type: str, def_types: Sequence[str]) -> float:
+    """공격 타입 1개 vs 방어 타입들 → 배율. 모르는 타입이면 1.0."""
+    a = TYPE_INDEX.get(move_type)
+    if a is None:
+        return 1.0
+    out = 1.0
+    row = CHART[a]
+    for t in _def_indices(def_types):
+        out *= MULTIPLIERS[row[t]]
+    return out
+
+
+def effectiveness_many(move_types: Sequence[str], def_types: Sequence[str]) -> List[float]:
+    """여러 공격 타입 vs 같은 방어 타입들 (한 턴의 기술 전체를 한 번에)."""
+    if _eff_kernel is None or len(move_types) < _KERNEL_MIN:
+        return [effectiveness(t, def_types) for t in move_types]
+    move_idx = np.array([TYPE_INDEX.get(t, -1) for t in move_types], dtype=np.int64)
+    def_idx = np.array(_def_indices(def_types), dtype=np.int64)
+    return [float(x) for x in _eff_kernel(_CHART_NP, _MULTS_NP, move_idx, def_idx)]
+
+
+def warmup() -> None:
+    """numba 커널 컴파일/캐시 로드를 미리 (배틀 시작 전에 한 번 호출)."""
+    if _eff_kernel is None:
+        return
+    _eff_kernel(_CHART_NP, _MULTS_NP, np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64))